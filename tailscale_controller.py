@@ -0,0 +1,925 @@
+"""
+Tailscale CLI controller used by the Tailscale GUI.
+Kept free of GTK imports so it can be used from scripts and tests.
+"""
+
+import atexit
+import http.client
+import subprocess
+import json
+import threading
+import os
+import re
+import socket
+import time
+from pathlib import Path
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    # orjson is optional; the stdlib parser handles the same bytes input
+    orjson = None
+    _loads = json.loads
+
+# How long a parsed `tailscale status --json` result is reused before the CLI
+# is asked again. One UI refresh calls several accessors in quick succession.
+STATUS_CACHE_TTL = 0.5
+
+# While the IPN bus watcher runs, every state change drops the cached status,
+# so it can be trusted for longer. This is only a safety net.
+STATUS_WATCH_TTL = 5.0
+
+# Longest a `tailscale status`/`tailscale down` call may take before it is
+# given up on, so a hung CLI can't keep a worker thread busy forever
+CLI_TIMEOUT = 10
+
+# Error output from tailscale/tailscaled that means we lack operator permission
+_PERM_RE = re.compile(r'access\s*denied|permission\s*denied|operator', re.I)
+
+# Fields is_connected() looks for in raw status JSON when nothing is cached
+_RUNNING_RE = re.compile(rb'"BackendState":\s*"Running"')
+_NODE_KEY_RE = re.compile(rb'"HaveNodeKey":\s*true')
+_AUTH_URL_RE = re.compile(rb'"AuthURL":\s*"[^"]')
+
+# How long `tailscale up` may take to fail before login counts as started
+LOGIN_GRACE_PERIOD = 0.8
+
+# A positive daemon check is trusted for this long before probing again
+DAEMON_CHECK_TTL = 5.0
+
+# Where tailscaled listens for LocalAPI connections on Linux
+TAILSCALED_SOCKETS = ('/run/tailscale/tailscaled.sock', '/var/run/tailscale/tailscaled.sock')
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection to the tailscaled LocalAPI over its UNIX socket"""
+    
+    def __init__(self, socket_path, timeout=5):
+        # tailscaled only accepts LocalAPI requests for this Host header
+        super().__init__('local-tailscaled.sock', timeout=timeout)
+        self.socket_path = socket_path
+    
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+def _error_text(result):
+    """Decode a finished CLI call's error output (stderr, else stdout)"""
+    output = result.stderr if result.stderr else result.stdout
+    return output.decode('utf-8', errors='ignore').strip()
+
+
+class TailscaleController:
+    """Handles Tailscale CLI operations"""
+    
+    def __init__(self):
+        self.tailscale_cmd = 'tailscale'
+        self.config_dir = Path.home() / '.config' / 'tailscale-gui'
+        self.profiles_file = self.config_dir / 'profiles.json'
+        # (timestamp, status) of the last `tailscale status --json` call
+        self._status_cache = None
+        self._status_lock = threading.Lock()
+        # Bumped by invalidate_status_cache(), so a fetch that started before
+        # a change doesn't cache what it read
+        self._status_generation = 0
+        # `tailscale debug watch-ipn` process, see start_status_watch()
+        self._watch_proc = None
+        # Called from the watcher thread after each change, see start_status_watch()
+        self._watch_callback = None
+        # (status, columns) of the last _parse_peers() call
+        self._parsed_peers = None
+        # (status, accessor results) of the last snapshot() call
+        self._snapshot = None
+        # monotonic timestamp of the last successful daemon check
+        self._daemon_seen_at = None
+        # Whether CLI writes work without sudo; None until one succeeds or is refused
+        self._has_operator = None
+        self.check_tailscale_installed()
+        self.ensure_config_dir()
+        # (mtime_ns, profiles) of the last profiles.json read
+        self._profiles_cache = None
+        # Profiles are edited in memory and written back by flush_profiles()
+        self._profiles = self.load_profiles()
+        self._profiles_dirty = False
+        atexit.register(self.flush_profiles)
+        atexit.register(self.stop_status_watch)
+    
+    def ensure_config_dir(self):
+        """Ensure config directory exists"""
+        # After the first run a stat is all this needs
+        if not self.config_dir.is_dir():
+            self.config_dir.mkdir(parents=True, exist_ok=True)
+    
+    def save_profiles(self, profiles):
+        """Save profiles to config file"""
+        # Write a sibling file and rename it over the old one, so a crash
+        # mid-write never leaves a truncated profiles.json behind
+        tmp_file = self.profiles_file.with_name(self.profiles_file.name + '.tmp')
+        try:
+            if orjson is not None:
+                with open(tmp_file, 'wb') as f:
+                    f.write(orjson.dumps(profiles, option=orjson.OPT_INDENT_2))
+            else:
+                with open(tmp_file, 'w') as f:
+                    json.dump(profiles, f, indent=2)
+            os.replace(tmp_file, self.profiles_file)
+            self._profiles_cache = (self.profiles_file.stat().st_mtime_ns, list(profiles))
+            return True
+        except Exception:
+            return False
+    
+    def load_profiles(self):
+        """Load profiles from config file (re-read only when it has changed)"""
+        try:
+            mtime = self.profiles_file.stat().st_mtime_ns
+        except OSError:
+            return []
+        cached = self._profiles_cache
+        if cached is not None and cached[0] == mtime:
+            return list(cached[1])
+        try:
+            # Bytes straight to the parser, like the status JSON
+            profiles = _loads(self.profiles_file.read_bytes())
+        except Exception:
+            return []
+        # Ensure it's a list
+        if not isinstance(profiles, list):
+            profiles = []
+        self._profiles_cache = (mtime, profiles)
+        return list(profiles)
+    
+    def get_profiles(self):
+        """Get saved profile nicknames, including changes not yet flushed"""
+        if not self._profiles_dirty:
+            # Picks up edits made to profiles.json outside the app; costs a
+            # stat() unless the file actually changed
+            self._profiles = self.load_profiles()
+        return list(self._profiles)
+    
+    def flush_profiles(self):
+        """Write pending profile changes to the config file"""
+        if not self._profiles_dirty:
+            return True
+        if self.save_profiles(self._profiles):
+            self._profiles_dirty = False
+            return True
+        return False
+    
+    def add_profile(self, nickname):
+        """Add a new profile nickname"""
+        # Check if already exists
+        if nickname not in self._profiles:
+            self._profiles.append(nickname)
+            self._profiles_dirty = True
+            return True
+        return False  # Already exists
+    
+    def remove_profile(self, nickname):
+        """Remove a profile nickname"""
+        if nickname in self._profiles:
+            self._profiles.remove(nickname)
+            self._profiles_dirty = True
+            return True
+        return False
+    
+    def check_tailscale_installed(self):
+        """Check if Tailscale is installed"""
+        try:
+            result = subprocess.run([self.tailscale_cmd, 'version'], capture_output=True)
+        except FileNotFoundError:
+            result = None
+        if result is None or result.returncode != 0:
+            raise RuntimeError("Tailscale is not installed. Please install it first.")
+    
+    def _probe_daemon_socket(self):
+        """Return True if tailscaled accepts connections on its UNIX socket"""
+        for path in TAILSCALED_SOCKETS:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.settimeout(1)
+                sock.connect(path)
+                return True
+            except OSError:
+                continue
+            finally:
+                sock.close()
+        return False
+    
+    def check_daemon_running(self):
+        """Check if tailscaled daemon is running"""
+        seen_at = self._daemon_seen_at
+        if seen_at is not None and time.monotonic() - seen_at < DAEMON_CHECK_TTL:
+            return True
+        running = self._check_daemon_running()
+        self._daemon_seen_at = time.monotonic() if running else None
+        return running
+    
+    def _check_daemon_running(self):
+        """Probe the tailscaled socket, falling back to systemctl"""
+        if self._probe_daemon_socket():
+            return True
+        try:
+            result = subprocess.run(
+                ['systemctl', '--user', 'is-active', 'tailscaled'],
+                capture_output=True,
+                timeout=2
+            )
+            if result.returncode == 0:
+                return True
+            # Try system-wide service
+            result = subprocess.run(
+                ['systemctl', 'is-active', 'tailscaled'],
+                capture_output=True,
+                timeout=2
+            )
+            return result.returncode == 0
+        except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.CalledProcessError):
+            # If systemctl fails, try checking via tailscale status
+            try:
+                result = subprocess.run(
+                    [self.tailscale_cmd, 'status'],
+                    capture_output=True,
+                    timeout=2
+                )
+                return True  # If command runs, daemon is likely running
+            except:
+                return False
+    
+    def check_operator_permission(self):
+        """Check if current user has operator permission"""
+        # A recent successful status call went through the same LocalAPI
+        # permission check, so there is no need to ask the CLI again
+        cached = self._status_cache
+        if cached is not None and cached[1] is not None and time.monotonic() - cached[0] < 2:
+            return True
+        try:
+            result = subprocess.run(
+                [self.tailscale_cmd, 'whoami'],
+                capture_output=True,
+                timeout=2
+            )
+            return result.returncode == 0
+        except (subprocess.TimeoutExpired, FileNotFoundError):
+            return False
+    
+    def get_operator_setup_command(self):
+        """Get the command to set operator permission"""
+        username = os.environ.get('USER', 'your-username')
+        return f"sudo tailscale set --operator={username}"
+    
+    def start_status_watch(self, on_change=None):
+        """Follow tailscaled's IPN bus and invalidate the status cache on change
+        
+        `tailscale status` has no streaming mode, but `tailscale debug watch-ipn`
+        prints a JSON notification for every state change. on_change, if given,
+        is called from the watcher thread after each one and once more when the
+        watcher exits. Returns False if the watcher cannot be started;
+        get_status() then keeps polling on its TTL.
+        """
+        if on_change is not None:
+            self._watch_callback = on_change
+        if self.is_watching_status():
+            return True
+        try:
+            self._watch_proc = subprocess.Popen(
+                [self.tailscale_cmd, 'debug', 'watch-ipn', '-netmap=false'],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL
+            )
+        except OSError:
+            self._watch_proc = None
+            return False
+        threading.Thread(target=self._watch_loop, args=(self._watch_proc,), daemon=True).start()
+        return True
+    
+    def stop_status_watch(self):
+        """Stop the IPN bus watcher if it is running"""
+        proc = self._watch_proc
+        self._watch_proc = None
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+    
+    def is_watching_status(self):
+        """Check if the IPN bus watcher is alive"""
+        proc = self._watch_proc
+        return proc is not None and proc.poll() is None
+    
+    def _watch_loop(self, proc):
+        """Drop the cached status whenever the watcher reports a notification"""
+        for line in proc.stdout:
+            # Notifications are indented JSON documents, so only the closing
+            # brace of a whole document starts at column 0
+            if line[:1] not in (b'\t', b' ') and line.rstrip().endswith(b'}'):
+                self._status_changed()
+        proc.stdout.close()
+        proc.wait()
+        self._status_changed()
+    
+    def _status_changed(self):
+        """Drop the cached status and tell the watch callback"""
+        self.invalidate_status_cache()
+        callback = self._watch_callback
+        if callback is not None:
+            callback()
+    
+    def _localapi_get(self, path):
+        """GET a LocalAPI endpoint from tailscaled, returns the body or None"""
+        for socket_path in TAILSCALED_SOCKETS:
+            conn = _UnixHTTPConnection(socket_path)
+            try:
+                conn.request('GET', path, headers={'Sec-Tailscale': 'localapi'})
+                response = conn.getresponse()
+                body = response.read()
+                # Anything but 200 (e.g. 403 for missing permissions) means the
+                # caller should fall back to the CLI
+                return body if response.status == 200 else None
+            except (OSError, http.client.HTTPException):
+                continue
+            finally:
+                conn.close()
+        return None
+    
+    def invalidate_status_cache(self):
+        """Forget the cached status so the next get_status() asks the CLI"""
+        self._status_generation += 1
+        self._status_cache = None
+    
+    def _fresh_status_cache(self):
+        """Return the cached (timestamp, status) if it is still fresh, else None"""
+        cached = self._status_cache
+        ttl = STATUS_WATCH_TTL if self.is_watching_status() else STATUS_CACHE_TTL
+        if cached is not None and time.monotonic() - cached[0] < ttl:
+            return cached
+        return None
+    
+    def _fetch_status_raw(self, peers=True):
+        """Fetch the status JSON as bytes, None if tailscaled can't be reached"""
+        # Ask tailscaled directly, which skips starting the CLI binary
+        raw = self._localapi_get('/localapi/v0/status' if peers else '/localapi/v0/status?peers=false')
+        if raw is None:
+            cmd = [self.tailscale_cmd, 'status', '--json']
+            if not peers:
+                cmd.append('--peers=false')
+            try:
+                result = subprocess.run(cmd, capture_output=True, timeout=CLI_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                return None
+            if result.returncode != 0:
+                return None
+            raw = result.stdout
+        return raw
+    
+    def get_status(self):
+        """Get current Tailscale status (cached, see STATUS_CACHE_TTL)"""
+        # Hold the lock across the CLI call so concurrent callers wait for the
+        # in-flight result instead of spawning their own `tailscale status`
+        with self._status_lock:
+            cached = self._fresh_status_cache()
+            if cached is not None:
+                return cached[1]
+            generation = self._status_generation
+            raw = self._fetch_status_raw()
+            try:
+                # Hand the raw bytes to the parser, no str decode needed
+                status = _loads(raw) if raw is not None else None
+            except json.JSONDecodeError:
+                status = None
+            if generation == self._status_generation:
+                self._status_cache = (time.monotonic(), status)
+            return status
+    
+    def is_connected(self, status=None):
+        """Check if Tailscale is connected"""
+        try:
+            if status is None and self._fresh_status_cache() is None:
+                # Nothing cached and only a boolean is needed: fetch the status
+                # without peers and test the three fields on the raw bytes
+                raw = self._fetch_status_raw(peers=False)
+                if raw is None:
+                    return False
+                return (_RUNNING_RE.search(raw) is not None
+                        and _NODE_KEY_RE.search(raw) is not None
+                        and _AUTH_URL_RE.search(raw) is None)
+            if status is None:
+                status = self.get_status()
+            if not status:
+                return False
+            # Check if BackendState is Running and we have a node key (authenticated)
+            backend_state = status.get('BackendState', '')
+            have_node_key = status.get('HaveNodeKey', False)
+            auth_url = status.get('AuthURL', '')
+            # Connected if backend is running, has node key, and no auth URL (meaning already authenticated)
+            return backend_state == 'Running' and have_node_key and auth_url == ''
+        except Exception:
+            return False
+    
+    def get_current_user(self, status=None):
+        """Get current logged-in user from status"""
+        try:
+            if status is None:
+                status = self.get_status()
+            if not status or 'Self' not in status:
+                return None
+            # Try to get user info from Self
+            self_info = status['Self']
+            # Check if there's a DNS name that might contain user info
+            dns_name = self_info.get('DNSName', '')
+            # The DNS name format is usually: hostname.tailXXXXX.ts.net
+            # We can't easily get the email from status, but we can show the hostname
+            hostname = self_info.get('HostName', '')
+            if hostname:
+                return hostname
+            # Fallback: try to extract from DNS name
+            if dns_name:
+                parts = dns_name.split('.')
+                if len(parts) > 0:
+                    return parts[0]
+            return "Connected"
+        except Exception:
+            return None
+    
+    def _parse_peers(self, status):
+        """Flatten Self and Peer entries of a status into parallel columns
+        
+        This device comes first when the status has a Self entry. The columns
+        are cached for the status object they were built from, so the accessors
+        of one refresh share a single walk over the peers. They copy out only
+        the fields the accessors use rather than keeping the peer dicts.
+        """
+        parsed = self._parsed_peers
+        if parsed is not None and parsed[0] is status:
+            return parsed[1]
+        
+        entries = []
+        if 'Self' in status:
+            entries.append((status['Self'].get('ID', ''), status['Self'], True))
+        for peer_id, peer_info in (status.get('Peer') or {}).items():
+            entries.append((peer_id, peer_info, False))
+        
+        columns = {
+            'ids': [], 'names': [], 'ips': [], 'hostnames': [],
+            'online': [], 'is_self': [], 'can_exit': [], 'user_ids': [],
+            # node ID / peer key -> index, peer Tailscale IP -> index
+            'by_id': {}, 'by_ip': {}
+        }
+        by_id = columns['by_id']
+        by_ip = columns['by_ip']
+        for index, (node_id, info, is_self) in enumerate(entries):
+            dns_name = info.get('DNSName', '')
+            tailscale_ips = info.get('TailscaleIPs')
+            columns['ids'].append(node_id)
+            columns['names'].append(dns_name)
+            # Strip any "/32" suffix once here so consumers get plain addresses
+            columns['ips'].append(str(tailscale_ips[0]).partition('/')[0] if tailscale_ips else '')
+            columns['hostnames'].append(info.get('HostName') or dns_name.partition('.')[0])
+            columns['online'].append(True if is_self else info.get('Online', False))
+            columns['is_self'].append(is_self)
+            # ExitNodeOption is the most reliable way to detect exit node capability
+            columns['can_exit'].append(info.get('ExitNodeOption', False))
+            columns['user_ids'].append(info.get('UserID'))
+            
+            by_id[str(node_id)] = index
+            if 'ID' in info:
+                by_id.setdefault(str(info['ID']), index)
+            if not is_self:
+                for peer_ip in tailscale_ips or ():
+                    by_ip.setdefault(str(peer_ip).partition('/')[0], index)
+        
+        # Indexes sorted by hostname, for listings shown in that order
+        hostnames = columns['hostnames']
+        columns['order'] = sorted(range(len(hostnames)), key=hostnames.__getitem__)
+        
+        self._parsed_peers = (status, columns)
+        return columns
+    
+    def get_devices(self, status=None):
+        """Get list of devices from Tailscale status"""
+        if status is None:
+            status = self.get_status()
+        if not status:
+            return []
+        
+        peers = self._parse_peers(status)
+        return [
+            {
+                'name': name or 'Unknown',
+                'ip': ip or 'Unknown',
+                'online': online,
+                'is_self': is_self
+            }
+            for name, ip, online, is_self in zip(
+                peers['names'], peers['ips'], peers['online'], peers['is_self'])
+        ]
+    
+    def snapshot(self):
+        """Collect the status the window shows from a single status fetch
+        
+        The accessor results are reused for as long as get_status() returns
+        the same cached status, so refreshes within its TTL cost nothing.
+        Profiles are not included: add_profile()/remove_profile() edit them on
+        the caller's thread, so read them there with get_profiles().
+        """
+        # An empty dict rather than None so the accessors don't fetch again
+        status = self.get_status() or {}
+        cached = self._snapshot
+        if cached is None or cached[0] is not status:
+            cached = (status, {
+                'connected': self.is_connected(status),
+                'user': self.get_current_user(status),
+                'exit_node': self.get_current_exit_node(status),
+                'exit_nodes': self.get_available_exit_nodes(status),
+                'devices': self.get_devices(status)
+            })
+            self._snapshot = cached
+        return dict(cached[1])
+    
+    def switch_account(self):
+        """Switch to a different Tailscale account (logout then up)"""
+        try:
+            # Check if daemon is running
+            if not self.check_daemon_running():
+                return False, "Tailscale daemon is not running. Please start it with: sudo systemctl start tailscaled"
+            
+            # Check if there are multiple accounts available
+            available_accounts = self.get_available_accounts()
+            
+            # Logout first if currently logged in
+            if self.is_connected():
+                try:
+                    result = subprocess.run(
+                        [self.tailscale_cmd, 'logout'],
+                        capture_output=True,
+                        timeout=5
+                    )
+                    self.invalidate_status_cache()
+                    # Wait a moment for logout to complete
+                    time.sleep(1)
+                except subprocess.TimeoutExpired:
+                    return False, "Logout timed out"
+                except subprocess.CalledProcessError as e:
+                    # Logout might fail, but continue anyway
+                    pass
+            
+            # Now use tailscale up - this will connect and prompt for auth if needed
+            # If multiple accounts exist, it should allow selecting
+            return self._do_login()
+        except FileNotFoundError:
+            return False, "Tailscale command not found. Is Tailscale installed?"
+        except Exception as e:
+            return False, f"Error switching account: {str(e)}"
+    
+    def login(self):
+        """Login to Tailscale (opens browser for authentication)"""
+        try:
+            # Check if daemon is running
+            if not self.check_daemon_running():
+                return False, "Tailscale daemon is not running. Please start it with: sudo systemctl start tailscaled"
+            
+            # If already connected, we don't need to login - just refresh
+            if self.is_connected():
+                current_user = self.get_current_user()
+                if current_user:
+                    return True, f"Already connected as {current_user}. Click 'Switch Account' to change accounts."
+                return True, "Already connected to Tailscale. Click 'Switch Account' to change accounts."
+            
+            # Not connected, proceed with login
+            return self._do_login()
+            
+        except FileNotFoundError:
+            return False, "Tailscale command not found. Is Tailscale installed?"
+        except Exception as e:
+            return False, f"Error logging in: {str(e)}"
+    
+    def _do_login(self):
+        """Internal method to perform the actual login using tailscale up"""
+        try:
+            # Use tailscale up instead of login - this connects and triggers auth if needed
+            env = os.environ.copy()
+            # Ensure DISPLAY is set for GUI apps
+            if 'DISPLAY' not in env:
+                env['DISPLAY'] = ':0'
+            
+            process = subprocess.Popen(
+                [self.tailscale_cmd, 'up'],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=env,
+                start_new_session=True
+            )
+            self.invalidate_status_cache()
+            
+            # Give it a moment to fail, but stop waiting as soon as it exits
+            try:
+                process.wait(timeout=LOGIN_GRACE_PERIOD)
+            except subprocess.TimeoutExpired:
+                # Process is running (waiting for browser authentication if needed) - success
+                return True, "Connecting to Tailscale. Please complete authentication in your browser if prompted."
+            
+            # Exiting cleanly means no authentication was needed
+            if process.returncode == 0:
+                self.invalidate_status_cache()
+                return True, "Connected to Tailscale."
+            
+            # Process exited with an error, get error message
+            stdout, stderr = process.communicate()
+            error_msg = ""
+            if stderr:
+                error_msg = stderr.decode('utf-8', errors='ignore').strip()
+            if stdout and not error_msg:
+                # Sometimes errors go to stdout
+                stdout_msg = stdout.decode('utf-8', errors='ignore').strip()
+                if "denied" in stdout_msg.lower() or "access" in stdout_msg.lower():
+                    error_msg = stdout_msg
+            
+            if error_msg:
+                # Check for permission denied error (various formats)
+                if _PERM_RE.search(error_msg):
+                    username = os.environ.get('USER', 'your-username')
+                    return False, f"Permission denied.\n\nIf you haven't run it yet, execute:\nsudo tailscale set --operator={username}\n\nIf you already ran that command, you MUST restart the Tailscale service:\nsudo systemctl restart tailscaled\n\nThen try logging in again."
+                return False, f"Connection failed: {error_msg}"
+            return False, "Connection process exited unexpectedly. Try running 'tailscale up' in a terminal to see the error."
+            
+        except Exception as e:
+            return False, f"Error during connection: {str(e)}"
+    
+    def get_available_accounts(self):
+        """Get list of available Tailscale accounts from status"""
+        try:
+            status = self.get_status()
+            if not status:
+                return []
+            
+            # Current account and accounts from peers
+            accounts = set(self._parse_peers(status)['user_ids'])
+            accounts.discard(None)
+            
+            return list(accounts)
+        except Exception:
+            return []
+    
+    def switch_to_profile(self, profile_name, sudo_password=None):
+        """Switch to a specific Tailscale profile/nickname"""
+        try:
+            # Check if daemon is running
+            if not self.check_daemon_running():
+                return False, "Tailscale daemon is not running. Please start it with: sudo systemctl start tailscaled"
+            
+            # Try without sudo first (will work if operator permissions are set),
+            # unless it has already been refused this session
+            if self._has_operator is not False:
+                result = subprocess.run(
+                    [self.tailscale_cmd, 'switch', profile_name],
+                    capture_output=True,
+                    timeout=10
+                )
+                
+                if result.returncode == 0:
+                    self._has_operator = True
+                    self.invalidate_status_cache()
+                    return True, f"Switched to profile: {profile_name}"
+                
+                error_msg = _error_text(result)
+                if _PERM_RE.search(error_msg):
+                    self._has_operator = False
+                elif self._has_operator:
+                    # Operator permission works, so sudo would fail the same way
+                    return False, f"Failed to switch: {error_msg}"
+            
+            # If it failed, try with sudo (will work if passwordless sudo is configured)
+            # Try sudo without password first (if passwordless sudo is configured)
+            sudo_result = subprocess.run(
+                ['sudo', '-n', self.tailscale_cmd, 'switch', profile_name],
+                capture_output=True,
+                timeout=10
+            )
+            
+            if sudo_result.returncode == 0:
+                self.invalidate_status_cache()
+                return True, f"Switched to profile: {profile_name}"
+            
+            # If both failed, we need password
+            return None, "sudo_required"
+        except subprocess.TimeoutExpired:
+            return False, "Switch operation timed out"
+        except FileNotFoundError:
+            return False, "Tailscale command not found. Is Tailscale installed?"
+        except Exception as e:
+            return False, f"Error switching profile: {str(e)}"
+    
+    def switch_to_profile_with_sudo(self, profile_name, sudo_password):
+        """Switch to profile using sudo with provided password"""
+        try:
+            # Use sudo with password via stdin
+            # Note: -S flag tells sudo to read password from stdin
+            process = subprocess.Popen(
+                ['sudo', '-S', self.tailscale_cmd, 'switch', profile_name],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=0
+            )
+            
+            # Send password followed by newline, then wait for completion
+            password_input = sudo_password + '\n'
+            stdout, stderr = process.communicate(input=password_input, timeout=15)
+            
+            # Clear password from memory (best effort)
+            password_input = None
+            
+            if process.returncode == 0:
+                self.invalidate_status_cache()
+                return True, f"Switched to profile: {profile_name}"
+            else:
+                error_msg = stderr.strip() if stderr else stdout.strip()
+                if not error_msg:
+                    error_msg = f"Command failed with return code {process.returncode}"
+                
+                error_lower = error_msg.lower()
+                if "password" in error_lower and ("incorrect" in error_lower or "wrong" in error_lower):
+                    return False, "Incorrect sudo password. Please try again."
+                elif "sorry" in error_lower or "try again" in error_lower:
+                    return False, "Sudo authentication failed. Please try again."
+                return False, f"Failed to switch: {error_msg}"
+        except subprocess.TimeoutExpired:
+            process.kill()
+            return False, "Switch operation timed out"
+        except Exception as e:
+            return False, f"Error switching profile: {str(e)}"
+    
+    def logout(self):
+        """Disconnect from Tailscale (tailscale down)"""
+        try:
+            result = subprocess.run(
+                [self.tailscale_cmd, 'down'],
+                capture_output=True,
+                timeout=CLI_TIMEOUT
+            )
+        except subprocess.TimeoutExpired:
+            return False, "Disconnect timed out"
+        if result.returncode:
+            return False, f"Error disconnecting: {_error_text(result)}"
+        self.invalidate_status_cache()
+        return True, "Tailscale disconnected successfully"
+    
+    def get_available_exit_nodes(self, status=None):
+        """Get list of available exit nodes from status"""
+        try:
+            if status is None:
+                status = self.get_status()
+            if not status:
+                return []
+            
+            peers = self._parse_peers(status)
+            exit_nodes = []
+            # Walk in hostname order so the result needs no sorting
+            for index in peers['order']:
+                dns_name = peers['names'][index]
+                ip = peers['ips'][index]
+                can_be_exit_node = peers['can_exit'][index]
+                # Only include if it can be an exit node
+                if dns_name and ip and can_be_exit_node:
+                    online = peers['online'][index]
+                    is_self = peers['is_self'][index]
+                    # Text for the exit node selector, e.g. "● device (100.x.y.z)"
+                    # with the device name taken from the DNSName
+                    display = f"{'●' if online else '○'} {dns_name.partition('.')[0]} ({ip})"
+                    if is_self:
+                        display += " (This Device)"
+                    exit_nodes.append({
+                        'id': peers['ids'][index],
+                        'name': dns_name,
+                        'ip': ip,
+                        'hostname': peers['hostnames'][index],
+                        'is_self': is_self,
+                        'online': online,
+                        'can_be_exit_node': can_be_exit_node,
+                        'display': display
+                    })
+            
+            return exit_nodes
+        except Exception:
+            return []
+    
+    def get_current_exit_node(self, status=None):
+        """Get current exit node being used"""
+        try:
+            if status is None:
+                status = self.get_status()
+            if not status:
+                return None
+            
+            # Check ExitNodeStatus at root level first (this is the most reliable)
+            exit_node_status = status.get('ExitNodeStatus', {})
+            exit_node_id = ''
+            
+            if exit_node_status:
+                if isinstance(exit_node_status, dict):
+                    # ExitNodeStatus is a dict with ID field
+                    exit_node_id = exit_node_status.get('ID', '')
+                elif exit_node_status:
+                    # ExitNodeStatus might be just the ID string
+                    exit_node_id = str(exit_node_status)
+            
+            # Fallback: Check root level for ExitNodeID
+            if not exit_node_id:
+                exit_node_id = status.get('ExitNodeID', '')
+            
+            # Also check Self for exit node info
+            if 'Self' in status:
+                self_info = status['Self']
+                # ExitNodeID field might be in Self
+                if not exit_node_id:
+                    exit_node_id = self_info.get('ExitNodeID', '')
+                
+                # Also check Self.ExitNodeStatus
+                if not exit_node_id:
+                    self_exit_status = self_info.get('ExitNodeStatus', {})
+                    if self_exit_status:
+                        if isinstance(self_exit_status, dict) and 'ID' in self_exit_status:
+                            exit_node_id = self_exit_status.get('ID', '')
+                        elif self_exit_status:
+                            exit_node_id = str(self_exit_status)
+                
+                if exit_node_id:
+                    # Also get IP from ExitNodeStatus if available (more reliable)
+                    exit_node_ip = None
+                    if exit_node_status and isinstance(exit_node_status, dict):
+                        tailscale_ips = exit_node_status.get('TailscaleIPs', [])
+                        if tailscale_ips:
+                            # IPs are in format "100.x.x.x/32", extract just the IP
+                            exit_node_ip = str(tailscale_ips[0]).partition('/')[0]
+                    
+                    # Look the node up by ID first; ExitNodeStatus ID might be a
+                    # StableNodeID, so fall back to matching by IP
+                    peers = self._parse_peers(status)
+                    index = peers['by_id'].get(str(exit_node_id))
+                    if index is None and exit_node_ip:
+                        index = peers['by_ip'].get(exit_node_ip)
+                    
+                    if index is not None:
+                        return {
+                            'id': str(exit_node_id),
+                            'name': peers['names'][index],
+                            'ip': exit_node_ip or peers['ips'][index],
+                            'hostname': peers['hostnames'][index]
+                        }
+            
+            return None
+        except Exception as e:
+            # Return None on any error to prevent crashes
+            return None
+    
+    def set_exit_node(self, exit_node_name=None):
+        """Set or clear exit node"""
+        try:
+            # Check if daemon is running
+            if not self.check_daemon_running():
+                return False, "Tailscale daemon is not running. Please start it with: sudo systemctl start tailscaled"
+            
+            if exit_node_name:
+                # Set exit node
+                result = subprocess.run(
+                    [self.tailscale_cmd, 'set', '--exit-node', exit_node_name],
+                    capture_output=True,
+                    timeout=10
+                )
+                
+                if result.returncode == 0:
+                    self._has_operator = True
+                    self.invalidate_status_cache()
+                    return True, f"Exit node set to: {exit_node_name}"
+                else:
+                    error_msg = _error_text(result)
+                    return False, f"Failed to set exit node: {error_msg}"
+            else:
+                # Clear exit node
+                result = subprocess.run(
+                    [self.tailscale_cmd, 'set', '--exit-node='],
+                    capture_output=True,
+                    timeout=10
+                )
+                
+                if result.returncode == 0:
+                    self._has_operator = True
+                    self.invalidate_status_cache()
+                    return True, "Exit node cleared"
+                else:
+                    error_msg = _error_text(result)
+                    return False, f"Failed to clear exit node: {error_msg}"
+                    
+        except subprocess.TimeoutExpired:
+            return False, "Operation timed out"
+        except FileNotFoundError:
+            return False, "Tailscale command not found. Is Tailscale installed?"
+        except Exception as e:
+            return False, f"Error setting exit node: {str(e)}"